@@ -23,13 +23,16 @@ See the :py:class:`srctools.game.Game` class for parsing ``gameinfo.txt`` files
 To mount a :py:class:`~srctools.bsp.BSP` file, use ``ZipFileSystem(bsp.pakfile)``.
 """
 from typing import (
-    Any, BinaryIO, Dict, Final, Generic, Iterator, List, Mapping, Optional, Set, TextIO,
-    Tuple, Union, cast,
+    Any, BinaryIO, Dict, Final, Generic, Iterator, List, Mapping, Optional, Sequence, Set,
+    TextIO, Tuple, Union, cast,
 )
 from typing_extensions import Self, TypeVar, deprecated
+from bisect import bisect_left, bisect_right
+from sys import intern
 from zipfile import ZipFile, ZipInfo
 import io
 import os
+import warnings
 
 from srctools import StringPath
 from srctools.keyvalues import Keyvalues
@@ -49,10 +52,29 @@ FileSysT_co = TypeVar('FileSysT_co', bound='FileSystem', default='FileSystem', c
 CACHE_KEY_INVALID: Final = -1
 """This is returned from :py:meth:`FileSystem.cache_key()` to indicate no key could be computed."""
 
+# The maximum number of lookups FileSystemChain caches.
+_CHAIN_CACHE_SIZE: Final = 4096
+_REFS_REMOVED: Final = 'References concept removed, filesystems are always open.'
 # This is the type of File._data. It should only be used by subclasses.
 _FileDataT = TypeVar('_FileDataT', default=Any)
 
 
+def _norm(name: str) -> str:
+    """Convert a filename into the case-insensitive key used for lookups."""
+    return name.replace('\\', '/').casefold()
+
+
+def _prefix_range(keys: Sequence[str], prefix: str) -> range:
+    """Return the indexes of the keys starting with the prefix.
+
+    The keys must be sorted, so these are a contiguous block.
+    """
+    if not prefix:
+        return range(len(keys))
+    # U+10FFFF is the largest codepoint, so sorts after any continuation.
+    return range(bisect_left(keys, prefix), bisect_right(keys, prefix + '\U0010FFFF'))
+
+
 def get_filesystem(path: str) -> 'FileSystem[Any]':
     """Return a filesystem given a path.
 
@@ -89,6 +111,8 @@ class File(Generic[FileSysT_co]):
     """Represents a file in a system. Should only be created by filesystems."""
     sys: FileSysT_co
     path: str
+    # If known, the normalised key the filesystem uses for this file.
+    _key: Optional[str]
     # This is _FileDataT of the filesys, but leave as Any here so the File
     # doesn't need to expose that TypeVar. FileSystem._get_data does the type
     # check.
@@ -99,16 +123,19 @@ class File(Generic[FileSysT_co]):
         system: FileSysT_co,
         path: str,
         data: Any,
+        key: Optional[str] = None,
     ) -> None:
         """Create a File.
 
         :param system: should be the filesystem which matches.
         :param path: is the relative path for the file.
         :param data: is filesystem-specific data, allowing directly opening the file.
+        :param key: is the normalised path, if the filesystem already computed it.
         """
         self.sys = system
         self.path = path
         self._data = data
+        self._key = key
 
     def __fspath__(self) -> str:
         """This can be interpreted as a path."""
@@ -142,36 +169,47 @@ class FileSystem(Generic[_FileDataT]):
     """Base class for different systems defining the interface."""
     path: str
     _ref_count: int
+    _norm_path: str
+    _hash_key: str
 
     def __init__(self, path: StringPath) -> None:
         self.path = os.fspath(path)
         self._ref_count = 0
+        # Used for equality and hashing, so only compute once.
+        self._norm_path = os.path.normpath(self.path)
+        # Store the string, not the hash - that's cached by str, and hashes differ between processes.
+        self._hash_key = type(self).__name__ + self._norm_path
 
     def __repr__(self) -> str:
         return f'{self.__class__.__name__}({self.path!r})'
 
-    @deprecated('References concept removed, filesystems are always open.')
+    @deprecated(_REFS_REMOVED, category=None)
     def open_ref(self) -> None:
         """:deprecated: No longer needs to be called."""
+        warnings.warn(_REFS_REMOVED, DeprecationWarning, stacklevel=2)
 
-    @deprecated('References concept removed, filesystems are always open.')
+    @deprecated(_REFS_REMOVED, category=None)
     def close_ref(self) -> None:
         """:deprecated: No longer needs to be called."""
+        warnings.warn(_REFS_REMOVED, DeprecationWarning, stacklevel=2)
 
-    @deprecated('References concept removed, filesystems are always open.')
+    @deprecated(_REFS_REMOVED, category=None)
     def _check_open(self) -> None:
         """Ensure self._ref is valid."""
+        warnings.warn(_REFS_REMOVED, DeprecationWarning, stacklevel=2)
 
     def read_kv1(self, path: Union[str, File[Self]], encoding: str = 'utf8') -> Keyvalues:
         """Read a Keyvalues1 file from the filesystem.
 
         This handles opening and closing files.
         """
+        # Read everything at once, the tokeniser is faster with a single string than lines.
         with self.open_str(path, encoding) as file:
-            return Keyvalues.parse(
-                file,
-                f'{self.path}:{path.path if isinstance(path, File) else path}',
-            )
+            data = file.read()
+        return Keyvalues.parse(
+            data,
+            f'{self.path}:{path.path if isinstance(path, File) else path}',
+        )
 
     @deprecated('Use FileSystem.read_kv1() instead.')
     def read_prop(self, path: str, encoding: str = 'utf8') -> Keyvalues:
@@ -185,19 +223,21 @@ class FileSystem(Generic[_FileDataT]):
         """Filesystems are equal if they have the same type and same path."""
         if not isinstance(other, type(self)):
             return NotImplemented  # If both ours -> False
-        return os.path.normpath(self.path) == os.path.normpath(other.path)
+        return self._norm_path == other._norm_path
 
     def __hash__(self) -> int:
-        return hash(type(self).__name__ + os.path.normpath(self.path))
+        return hash(self._hash_key)
 
-    @deprecated('References concept removed, filesystems are always open.')
+    @deprecated(_REFS_REMOVED, category=None)
     def __enter__(self) -> Self:
         """:deprecated: No longer needs to be used as a context manager."""
+        warnings.warn(_REFS_REMOVED, DeprecationWarning, stacklevel=2)
         return self
 
-    @deprecated('References concept removed, filesystems are always open.')
+    @deprecated(_REFS_REMOVED, category=None)
     def __exit__(self, *args: object) -> None:
         """:deprecated: No longer needs to be used as a context manager."""
+        warnings.warn(_REFS_REMOVED, DeprecationWarning, stacklevel=2)
         return None
 
     def __iter__(self) -> Iterator[File[Self]]:
@@ -237,6 +277,14 @@ class FileSystem(Generic[_FileDataT]):
         """Iterate over all files in the specified subfolder, yielding each."""
         raise NotImplementedError
 
+    def walk_folder_fast(self, folder: str = '') -> Iterator[Tuple[str, _FileDataT]]:
+        """Iterate over all files in the specified subfolder, yielding the path and file data.
+
+        This avoids constructing :py:class:`File` objects, if only the paths are required.
+        """
+        for file in self.walk_folder(folder):
+            yield file.path, self._get_data(file)
+
     def open_str(self, name: Union[str, File[Self]], encoding: str = 'utf8') -> TextIO:
         """Open a file in unicode mode or raise FileNotFoundError.
 
@@ -264,11 +312,25 @@ class FileSystemChain(FileSystem[File[FileSystem[Any]]]):
 
     Each system can additionally be filtered to only allow access to files inside a subfolder. These
     will appear as if they are at the root level.
+
+    If ``cache_lookups`` is enabled, the results of looking up files are cached, so repeated
+    lookups only check the system which contains the file (or none at all, if missing). This is
+    discarded whenever :py:attr:`systems` changes, but if files are added to or removed from the
+    underlying systems, :py:meth:`clear_cache()` must be called.
     """
+    # Name -> index of the system containing it, or None if missing.
+    _lookup_cache: Optional[Dict[str, Optional[int]]]
 
-    def __init__(self, *systems: Union[FileSystem[Any], Tuple[FileSystem[Any], str]]) -> None:
+    def __init__(
+        self,
+        *systems: Union[FileSystem[Any], Tuple[FileSystem[Any], str]],
+        cache_lookups: bool = False,
+    ) -> None:
         super().__init__('')
         self.systems: List[Tuple[FileSystem[Any], str]] = []
+        self._lookup_cache = {} if cache_lookups else None
+        # The systems the cache was computed for.
+        self._cache_systems: List[Tuple[FileSystem[Any], str]] = []
         for sys in systems:
             if isinstance(sys, tuple):
                 self.add_sys(*sys)
@@ -289,6 +351,20 @@ class FileSystemChain(FileSystem[File[FileSystem[Any]]]):
     def __hash__(self) -> int:
         return hash(tuple(self.systems))
 
+    @property
+    def cache_lookups(self) -> bool:
+        """If set, the results of looking up files are cached."""
+        return self._lookup_cache is not None
+
+    def clear_cache(self) -> None:
+        """Discard cached lookups, if ``cache_lookups`` is enabled.
+
+        This must be called if files were added to or removed from the underlying systems.
+        """
+        if self._lookup_cache is not None:
+            self._lookup_cache.clear()
+        self._cache_systems = self.systems.copy()
+
     @classmethod
     def get_system(cls, file: File[Self]) -> FileSystem[Any]:
         """Retrieve the system for a File, if it was produced from a FileSystemChain."""
@@ -314,19 +390,72 @@ class FileSystemChain(FileSystem[File[FileSystem[Any]]]):
         else:
             self.systems.append((sys, prefix))
 
+    def _single_system(self) -> Optional[FileSystem[Any]]:
+        """If this contains only one system without a prefix, return it.
+
+        That is very common, and lookups can then go directly to that system.
+        """
+        if len(self.systems) == 1:
+            sys, prefix = self.systems[0]
+            if not prefix:
+                return sys
+        return None
+
+    def _file_exists(self, name: str) -> bool:
+        sys = self._single_system()
+        if sys is not None:
+            return sys._file_exists(name.replace('\\', '/'))
+        return super()._file_exists(name)
+
     def _get_file(self, name: str) -> File[Self]:
         """Search for a file on each filesystem in turn."""
-        for sys, prefix in self.systems:
-            full_name = os.path.join(prefix, name).replace('\\', '/')
+        sys = self._single_system()
+        if sys is not None:
+            name = name.replace('\\', '/')
+            return File(self, name, sys._get_file(name))
+
+        cache = self._lookup_cache
+        if cache is None:
+            systems = enumerate(self.systems)
+        else:
+            if self._cache_systems != self.systems:
+                # The systems were changed, so our lookups are now invalid.
+                self.clear_cache()
+            try:
+                index = cache[name]
+            except KeyError:
+                systems = enumerate(self.systems)
+            else:
+                if index is None:
+                    raise FileNotFoundError(name)
+                # If the file was since removed, this will fall through to search the rest.
+                systems = enumerate(self.systems[index:], index)
+
+        for index, (sys, prefix) in systems:
+            if prefix:
+                full_name = os.path.join(prefix, name).replace('\\', '/')
+            else:
+                full_name = name.replace('\\', '/')
             try:
                 file_info = sys._get_file(full_name)
             except FileNotFoundError:
                 continue
+            if cache is not None:
+                self._add_cache(cache, name, index)
             # Pass the original file instance, so we can open
             # from the original system.
             return File(self, full_name, file_info)
+        if cache is not None:
+            self._add_cache(cache, name, None)
         raise FileNotFoundError(name)
 
+    @staticmethod
+    def _add_cache(cache: Dict[str, Optional[int]], name: str, index: Optional[int]) -> None:
+        """Record the result of a lookup, discarding the oldest if the cache is full."""
+        if name not in cache and len(cache) >= _CHAIN_CACHE_SIZE:
+            del cache[next(iter(cache))]
+        cache[name] = index
+
     def open_str(self, name: Union[str, File[Self]], encoding: str = 'utf8') -> TextIO:
         """Open a file in unicode mode or raise FileNotFoundError.
 
@@ -334,6 +463,10 @@ class FileSystemChain(FileSystem[File[FileSystem[Any]]]):
         """
         if isinstance(name, File):
             return self._get_data(name).open_str(encoding)
+        sys = self._single_system()
+        if sys is not None:
+            # Go via _get_file(), so folders produce FileNotFoundError.
+            return sys._get_file(name.replace('\\', '/')).open_str(encoding)
         return self._get_file(name).open_str(encoding)
 
     def open_bin(self, name: Union[str, File[Self]]) -> BinaryIO:
@@ -343,6 +476,10 @@ class FileSystemChain(FileSystem[File[FileSystem[Any]]]):
         """
         if isinstance(name, File):
             return self._get_data(name).open_bin()
+        sys = self._single_system()
+        if sys is not None:
+            # Go via _get_file(), so folders produce FileNotFoundError.
+            return sys._get_file(name.replace('\\', '/')).open_bin()
         return self._get_file(name).open_bin()
 
     def walk_folder(self, folder: str = '') -> Iterator[File[Self]]:
@@ -351,13 +488,19 @@ class FileSystemChain(FileSystem[File[FileSystem[Any]]]):
         This requires temporarily storing the visited paths, to prevent revisiting them. If repeated
         access is not problematic, prefer :py:func:`~FileSystemChain.walk_folder_repeat()`.
         """
+        if isinstance(self._single_system(), (ZipFileSystem, VPKFileSystem, VirtualFileSystem)):
+            # These have casefolded keys, so nothing can be repeated.
+            yield from self.walk_folder_repeat(folder)
+            return
         done: Set[str] = set()
-        for file in self.walk_folder_repeat(folder):
-            folded = file.path.casefold()
-            if folded in done:
-                continue
-            done.add(folded)
-            yield file
+        for path, file in self.walk_folder_fast(folder):
+            # Reuse the key the original system computed, if the path wasn't changed by a prefix.
+            key = file._key if path == file.path else None
+            # Check if this was added, instead of hashing again to check membership first.
+            size = len(done)
+            done.add(key if key is not None else path.casefold())
+            if len(done) != size:
+                yield File(self, path, file, key)
 
     def walk_folder_repeat(self, folder: str = '') -> Iterator[File[Self]]:
         """Walk folders, but allow repeating files.
@@ -366,14 +509,22 @@ class FileSystemChain(FileSystem[File[FileSystem[Any]]]):
         highest-priority. Using this instead of  :py:func:`~FileSystemChain.walk_folder()` is
         cheaper, since a set of visited files must be maintained.
         """
+        for path, file in self.walk_folder_fast(folder):
+            yield File(self, path, file, file._key if path == file.path else None)
+
+    def walk_folder_fast(self, folder: str = '') -> Iterator[Tuple[str, File[FileSystem[Any]]]]:
+        """Walk folders, yielding the path and the file from the original system.
+
+        Like :py:func:`~FileSystemChain.walk_folder_repeat()`, files may be repeated.
+        """
         for sys, prefix in self.systems:
+            if not prefix:
+                for file in sys.walk_folder(folder):
+                    yield file.path, file
+                continue
             full_folder = os.path.join(prefix, folder).replace('\\', '/')
             for file in sys.walk_folder(full_folder):
-                yield File(
-                    self,
-                    os.path.relpath(file.path, prefix).replace('\\', '/'),
-                    file,
-                )
+                yield os.path.relpath(file.path, prefix).replace('\\', '/'), file
 
     def _get_cache_key(self, file: File[Self]) -> int:
         """Return the last modified time of this file.
@@ -391,17 +542,23 @@ class VirtualFileSystem(FileSystem[str]):
 
     The dict should map file paths to either bytes or strings.
     The encoding arg specifies how text data is presented if open_bin()
-    is called.
+    is called. The mapping is copied, later changes to it are not seen.
     """
     _mapping: Mapping[str, Tuple[str, Union[str, bytes, bytearray, memoryview]]]
+    # Computed on first use, bytearray data isn't hashable.
+    _mapping_hash: Optional[int]
 
     def __init__(self, mapping: Mapping[str, Union[str, bytes, bytearray, memoryview]], encoding: str = 'utf8') -> None:
         super().__init__('<virtual>')
+        # Normalise here, so lookups only need to do the cheap conversion.
         self._mapping = {
-            self._clean_path(filename): (filename, data)
+            intern(_norm(os.path.normpath(filename))): (filename, data)
             for filename, data in
             dict(mapping).items()
         }
+        # Sorted, so walk_folder() can find the range matching a folder.
+        self._sorted_keys = sorted(self._mapping)
+        self._mapping_hash = None
         self.bytes_encoding = encoding
 
     def __eq__(self, other: object) -> bool:
@@ -413,14 +570,28 @@ class VirtualFileSystem(FileSystem[str]):
         )
 
     def __hash__(self) -> int:
-        return hash(self.bytes_encoding) ^ hash(tuple(self._mapping.values()))
+        if self._mapping_hash is None:
+            self._mapping_hash = hash(tuple(self._mapping.values()))
+        return hash(self.bytes_encoding) ^ self._mapping_hash
+
+    def __getstate__(self) -> Dict[str, Any]:
+        """Don't pickle the cached hash, since string hashes differ between processes."""
+        state = self.__dict__.copy()
+        state['_mapping_hash'] = None
+        return state
 
     @classmethod
     def _clean_path(cls, path: Union[str, File[Self]]) -> str:
         """Convert paths to one representation."""
         if isinstance(path, File):
+            if path._key is not None:
+                return path._key
             path = path.path
-        return os.path.normpath(path).replace('\\', '/').casefold()
+        key = _norm(path)
+        if '/.' in key or '//' in key or key.startswith('.'):
+            # Rare, only do the full normalisation if it could change something.
+            return _norm(os.path.normpath(key))
+        return key
 
     def open_bin(self, name: Union[str, File[Self]]) -> BinaryIO:
         """Return a bytes buffer for a 'file'."""
@@ -460,81 +631,178 @@ class VirtualFileSystem(FileSystem[str]):
 
     def walk_folder(self, folder: str = '') -> Iterator[File[Self]]:
         """Return all files that are 'subfolders' of the provided folder."""
-        folder = self._clean_path(folder)
-
-        for filename, data in self._mapping.values():
-            if filename.startswith(folder):
-                yield File(self, filename, filename)
+        keys = self._sorted_keys
+        for i in _prefix_range(keys, self._clean_path(folder)):
+            key = keys[i]
+            filename, data = self._mapping[key]
+            yield File(self, filename, filename, key)
+
+    def walk_folder_fast(self, folder: str = '') -> Iterator[Tuple[str, str]]:
+        """Return the paths of all files that are 'subfolders' of the provided folder."""
+        keys = self._sorted_keys
+        for i in _prefix_range(keys, self._clean_path(folder)):
+            filename, data = self._mapping[keys[i]]
+            yield filename, filename
 
     def _file_exists(self, name: str) -> bool:
         return self._clean_path(name) in self._mapping
 
     def _get_file(self, name: str) -> File[Self]:
         """Access the specified file."""
+        key = self._clean_path(name)
         try:
-            filename, data = self._mapping[self._clean_path(name)]
+            filename, data = self._mapping[key]
         except KeyError:
             raise FileNotFoundError(name) from None
-        return File(self, filename, filename)
+        return File(self, filename, filename, key)
 
 
 class RawFileSystem(FileSystem[str]):
     """Accesses files in a real folder.
 
     This can prohibit access to folders above the root.
+
+    If ``cache_folders`` is enabled, checking if files exist lists the whole folder once and then
+    reuses that. This is much faster when checking many files, especially on Windows, but files
+    added or removed afterwards will not be noticed unless :py:meth:`invalidate()` is called.
     """
-    def __init__(self, path: StringPath, constrain_path: bool = True) -> None:
+    # Normcased folder path -> normcased filenames inside.
+    _folder_cache: Optional[Dict[str, Set[str]]]
+
+    def __init__(
+        self,
+        path: StringPath,
+        constrain_path: bool = True,
+        *,
+        cache_folders: bool = False,
+    ) -> None:
         super().__init__(os.path.abspath(path))
         self.constrain_path = constrain_path
+        # Paths inside the root start with this.
+        self._path_prefix = self.path.rstrip(os.sep) + os.sep
+        self._folder_cache = {} if cache_folders else None
 
     def __repr__(self) -> str:
+        if self._folder_cache is not None:
+            return (
+                f'{self.__class__.__name__}({self.path!r}, '
+                f'constrain_path={self.constrain_path}, cache_folders=True)'
+            )
         return (
             f'{self.__class__.__name__}({self.path!r}, '
             f'constrain_path={self.constrain_path})'
         )
 
+    @property
+    def cache_folders(self) -> bool:
+        """If set, folder contents are cached when checking if files exist."""
+        return self._folder_cache is not None
+
+    def invalidate(self, folder: Optional[str] = None) -> None:
+        """Discard cached folder contents, if ``cache_folders`` is enabled.
+
+        :param folder: If specified, only discard this folder. Otherwise, all are discarded.
+        """
+        if self._folder_cache is None:
+            return
+        if folder is None:
+            self._folder_cache.clear()
+        else:
+            self._folder_cache.pop(os.path.normcase(self._resolve_path(folder)), None)
+
+    def _is_file(self, abs_path: str) -> bool:
+        """Check if this absolute path is a file, using the folder cache if enabled."""
+        if self._folder_cache is None:
+            return os.path.isfile(abs_path)
+        if abs_path == self.path:
+            # The root is a folder, don't scan its parent which is outside our tree.
+            return False
+        folder, filename = os.path.split(abs_path)
+        folder = os.path.normcase(folder)
+        try:
+            contents = self._folder_cache[folder]
+        except KeyError:
+            try:
+                with os.scandir(folder) as scan:
+                    contents = {
+                        os.path.normcase(entry.name)
+                        for entry in scan
+                        if entry.is_file()
+                    }
+            except OSError:  # Missing, or not a folder.
+                contents = set()
+            self._folder_cache[folder] = contents
+        return os.path.normcase(filename) in contents
+
     def _resolve_path(self, path: str) -> str:
         """Get the absolute path."""
-        abs_path = os.path.abspath(os.path.join(self.path, path))
-        if self.constrain_path and not abs_path.startswith(self.path):
+        # Our path is already absolute, so this doesn't need abspath() to check the working dir.
+        abs_path = os.path.normpath(os.path.join(self.path, path))
+        if self.constrain_path and not (
+            abs_path.startswith(self._path_prefix) or abs_path == self.path
+        ):
             raise RootEscapeError(self.path, path)
         return abs_path
 
     def walk_folder(self, folder: str = '') -> Iterator[File[Self]]:
         """Yield files in a folder."""
+        for path, data in self.walk_folder_fast(folder):
+            yield File(self, path, data)
+
+    def walk_folder_fast(self, folder: str = '') -> Iterator[Tuple[str, str]]:
+        """Yield the path for files in a folder, which is also the file data."""
         path = self._resolve_path(folder)
-        for dirpath, dirnames, filenames in os.walk(path):
-            for file in filenames:
-                rel_path = os.path.relpath(
-                    os.path.join(dirpath, file),
-                    self.path,
-                ).replace('\\', '/')
-                yield File(self, rel_path, rel_path)
+        rel_path = os.path.relpath(path, self.path).replace('\\', '/')
+        for filename in self._walk_dir(path, '' if rel_path == '.' else rel_path + '/'):
+            yield filename, filename
+
+    def _walk_dir(self, path: str, rel_path: str) -> Iterator[str]:
+        """Recursively yield the relative paths of files in a folder, in the same order as os.walk().
+
+        This uses scandir() directly, so checking if entries are folders usually doesn't need a stat.
+        """
+        subfolders: List['os.DirEntry[str]'] = []
+        try:
+            scan = os.scandir(path)
+        except OSError:
+            return
+        with scan:
+            for entry in scan:
+                if entry.is_dir():
+                    # Like os.walk(), don't follow symlinks to folders.
+                    if not entry.is_symlink():
+                        subfolders.append(entry)
+                else:
+                    yield rel_path + entry.name
+        for entry in subfolders:
+            yield from self._walk_dir(entry.path, f'{rel_path}{entry.name}/')
+
+    def _get_abs_path(self, name: Union[str, File[Self]]) -> str:
+        """Get the absolute path for a filename or file."""
+        if isinstance(name, File):
+            name = self._get_data(name)
+        return self._resolve_path(name)
 
     def open_str(self, name: Union[str, File[Self]], encoding: str = 'utf8') -> TextIO:
         """Open a file in unicode mode or raise FileNotFoundError.
 
         This should be closed when done.
         """
-        if isinstance(name, File):
-            name = self._get_data(name)
-        return open(self._resolve_path(name), encoding=encoding)
+        return open(self._get_abs_path(name), encoding=encoding)
 
     def open_bin(self, name: Union[str, File[Self]]) -> BinaryIO:
         """Open a file in bytes mode or raise FileNotFoundError.
 
         This should be closed when done.
         """
-        if isinstance(name, File):
-            name = self._get_data(name)
-        return open(self._resolve_path(name), mode='rb')
+        return open(self._get_abs_path(name), mode='rb')
 
     def _file_exists(self, name: str) -> bool:
         # We don't need this, but it should match other filesystems.
-        return os.path.isfile(self._resolve_path(name))
+        return self._is_file(self._resolve_path(name))
 
     def _get_file(self, name: str) -> File[Self]:
-        if os.path.isfile(self._resolve_path(name)):
+        if self._is_file(self._resolve_path(name)):
             name = name.replace('\\', '/')
             return File(self, name, name)
         raise FileNotFoundError(name)
@@ -551,6 +819,12 @@ class ZipFileSystem(FileSystem[ZipInfo]):
     """Accesses files in a zip file."""
     _no_close: bool
     zip: ZipFile
+    # The case-insensitive index, built when first required.
+    _name_to_info: Optional[Dict[str, ZipInfo]]
+    # The number of members when the index was built, if it changes files were added.
+    _index_size: int
+    _sorted_keys: List[str]
+    _sorted_infos: List[ZipInfo]
 
     def __init__(self, path: StringPath, zipfile: Optional[ZipFile] = None) -> None:
         super().__init__(path)
@@ -562,41 +836,71 @@ class ZipFileSystem(FileSystem[ZipInfo]):
         else:
             self._no_close = False
             self.zip = ZipFile(path)
-
-        self._name_to_info: Dict[str, ZipInfo] = {
-            info.filename.casefold(): info
-            for info in self.zip.infolist()
-            # Some zip files include entries for the directories too.
-            # They have a trailing slash.
-            if not info.filename.endswith('/')
-        }
+        # Building this is expensive for large archives, and may not be needed if only a few
+        # specific files are read.
+        self._name_to_info = None
+        self._index_size = 0
+        self._sorted_keys = []
+        self._sorted_infos = []
+
+    def _get_index(self) -> Dict[str, ZipInfo]:
+        """Build the case-insensitive index, if not done already or the zip was written to."""
+        if self._name_to_info is None or len(self.zip.filelist) != self._index_size:
+            self._index_size = len(self.zip.filelist)
+            self._name_to_info = {
+                intern(_norm(info.filename)): info
+                for info in self.zip.infolist()
+                # Some zip files include entries for the directories too.
+                # They have a trailing slash.
+                if not info.filename.endswith('/')
+            }
+            # Sorted parallel lists, so walk_folder() can find the range matching a folder.
+            self._sorted_keys = sorted(self._name_to_info)
+            self._sorted_infos = [self._name_to_info[key] for key in self._sorted_keys]
+        return self._name_to_info
+
+    def _find(self, name: str) -> Optional[ZipInfo]:
+        """Look up the info for a file, or return None if missing."""
+        # Try the zip's own case-sensitive lookup first, so the index often isn't needed.
+        # Always do this, so an exact match wins consistently if names differ only in case.
+        info = self.zip.NameToInfo.get(name.replace('\\', '/'))
+        if info is not None and not info.filename.endswith('/'):
+            return info
+        return self._get_index().get(_norm(name))
+
+    def _lookup(self, name: Union[str, File[Self]]) -> ZipInfo:
+        """Get the info for a file or filename, or raise FileNotFoundError."""
+        if isinstance(name, File):
+            return self._get_data(name)
+        info = self._find(name)
+        if info is None:
+            raise FileNotFoundError(f'{self.path}:{name}')
+        return info
 
     def walk_folder(self, folder: str = '') -> Iterator[File[Self]]:
         """Yield files in a folder."""
-        # \\ is not allowed in zips.
-        folder = folder.replace('\\', '/').casefold()
-        for filename, fileinfo in self._name_to_info.items():
-            if filename.startswith(folder):
-                yield File(self, fileinfo.filename, fileinfo)
+        self._get_index()
+        keys = self._sorted_keys
+        infos = self._sorted_infos
+        for i in _prefix_range(keys, _norm(folder)):
+            info = infos[i]
+            yield File(self, info.filename, info, keys[i])
+
+    def walk_folder_fast(self, folder: str = '') -> Iterator[Tuple[str, ZipInfo]]:
+        """Yield the path and info for files in a folder."""
+        self._get_index()
+        infos = self._sorted_infos
+        for i in _prefix_range(self._sorted_keys, _norm(folder)):
+            info = infos[i]
+            yield info.filename, info
 
     def open_bin(self, name: Union[str, File[Self]]) -> BinaryIO:
         """Open a file in bytes mode or raise FileNotFoundError.
 
         The filesystem needs to be open while accessing this.
         """
-        # We need the ZipInfo object, either direct from a File or via a lookup
-        # on the spot.
-        if isinstance(name, File):
-            info = self._get_data(name)
-        else:
-            name = name.replace('\\', '/')
-            try:
-                info = self._name_to_info[name.casefold()]
-            except KeyError:
-                raise FileNotFoundError(f'{self.path}:{name}') from None
-
         # Type of open() is IO[bytes], basically the same.
-        return cast(BinaryIO, self.zip.open(info))
+        return cast(BinaryIO, self.zip.open(self._lookup(name)))
 
     def open_str(
         self,
@@ -611,15 +915,11 @@ class ZipFileSystem(FileSystem[ZipInfo]):
         return io.TextIOWrapper(self.open_bin(name), encoding)
 
     def _get_file(self, name: str) -> File[Self]:
-        name = name.replace('\\', '/')
-        try:
-            info = self._name_to_info[name.casefold()]
-        except KeyError:
-            raise FileNotFoundError(f'{self.path}:{name}') from None
-        return File(self, name, info)
+        info = self._lookup(name)
+        return File(self, info.filename, info)
 
     def _file_exists(self, name: str) -> bool:
-        return name.replace('\\', '/').casefold() in self._name_to_info
+        return self._find(name) is not None
 
     def _get_cache_key(self, file: File[Self]) -> int:
         """Return the CRC of the VPK file."""
@@ -629,47 +929,88 @@ class ZipFileSystem(FileSystem[ZipInfo]):
 class VPKFileSystem(FileSystem[VPKFile]):
     """Accesses files in a VPK file."""
     vpk: VPK
-    _name_to_file: Dict[str, VPKFile]
+    # The case-insensitive index, built when first required.
+    _name_to_file: Optional[Dict[str, VPKFile]]
+    _sorted_keys: List[str]
+    _sorted_files: List[VPKFile]
+    _sorted_names: List[str]
 
     def __init__(self, path: StringPath) -> None:
         super().__init__(path)
         self.vpk = VPK(self.path)
-        # Used to enforce case-insensitivity.
-        self._name_to_file = {
-            file.filename.replace('\\', '/').casefold(): file
-            for file in self.vpk
-        }
+        self._name_to_file = None
+        self._sorted_keys = []
+        self._sorted_files = []
+        self._sorted_names = []
+
+    def _get_index(self) -> Dict[str, VPKFile]:
+        """Build the case-insensitive index, if not done already."""
+        if self._name_to_file is None:
+            self._name_to_file = {}
+            # FileInfo.filename is rebuilt each time, so store it.
+            filenames: Dict[str, str] = {}
+            for file in self.vpk:
+                filename = intern(file.filename)
+                key = intern(_norm(filename))
+                self._name_to_file[key] = file
+                filenames[key] = filename
+            # Sorted parallel lists, so walk_folder() can find the range matching a folder.
+            self._sorted_keys = sorted(self._name_to_file)
+            self._sorted_files = [self._name_to_file[key] for key in self._sorted_keys]
+            self._sorted_names = [filenames[key] for key in self._sorted_keys]
+        return self._name_to_file
+
+    def _find(self, name: str) -> Optional[VPKFile]:
+        """Look up the info for a file, or return None if missing."""
+        # Try the VPK's own case-sensitive lookup first, so the index often isn't needed.
+        # Always do this, so an exact match wins consistently if names differ only in case.
+        # That normalises the path, only accept it if the index would find the same file.
+        name = name.replace('\\', '/')
+        try:
+            file = self.vpk[name]
+        except KeyError:
+            pass
+        else:
+            if file.filename == name:
+                return file
+        return self._get_index().get(_norm(name))
+
+    def _lookup(self, name: Union[str, File[Self]]) -> VPKFile:
+        """Get the info for a file or filename, or raise FileNotFoundError."""
+        if isinstance(name, File):
+            return self._get_data(name)
+        file = self._find(name)
+        if file is None:
+            raise FileNotFoundError(name)
+        return file
 
     def _file_exists(self, name: str) -> bool:
-        return name.casefold().replace('\\', '/') in self._name_to_file
+        return self._find(name) is not None
 
     def _get_file(self, name: str) -> File[Self]:
-        key = name.casefold().replace('\\', '/')
-        try:
-            file = self._name_to_file[key]
-        except KeyError:
-            raise FileNotFoundError(name) from None
-        return File(self, key, file)
+        file = self._lookup(name)
+        return File(self, file.filename, file)
 
     def walk_folder(self, folder: str = '') -> Iterator[File[Self]]:
         """Yield files in a folder."""
-        # All VPK files use forward slashes.
-        folder = folder.replace('\\', '/')
-        for file in self._name_to_file.values():
-            if file.dir.startswith(folder):
-                yield File(self, file.filename, file)
+        self._get_index()
+        keys = self._sorted_keys
+        files = self._sorted_files
+        names = self._sorted_names
+        for i in _prefix_range(keys, _norm(folder)):
+            yield File(self, names[i], files[i], keys[i])
+
+    def walk_folder_fast(self, folder: str = '') -> Iterator[Tuple[str, VPKFile]]:
+        """Yield the path and info for files in a folder."""
+        self._get_index()
+        files = self._sorted_files
+        names = self._sorted_names
+        for i in _prefix_range(self._sorted_keys, _norm(folder)):
+            yield names[i], files[i]
 
     def open_bin(self, name: Union[str, File[Self]]) -> BinaryIO:
         """Open a file in bytes mode or raise FileNotFoundError."""
-        # Extract our VPK info directly.
-        if isinstance(name, File):
-            file = self._get_data(name)
-        else:
-            try:
-                file = self._name_to_file[name.casefold().replace('\\', '/')]
-            except KeyError:
-                raise FileNotFoundError(name) from None
-        return io.BytesIO(file.read())
+        return io.BytesIO(self._lookup(name).read())
 
     def open_str(
         self,
@@ -677,17 +1018,9 @@ class VPKFileSystem(FileSystem[VPKFile]):
         encoding: str = 'utf8',
     ) -> TextIO:
         """Open a file in unicode mode or raise FileNotFoundError."""
-        # File() calls with the VPK object we need directly.
-        if isinstance(name, File):
-            file = self._get_data(name)
-        else:
-            try:
-                file = self._name_to_file[name.casefold().replace('\\', '/')]
-            except KeyError:
-                raise FileNotFoundError(name) from None
         # Wrap the data to treat it as bytes, then
         # wrap that to decode and clean up universal newlines.
-        return io.TextIOWrapper(io.BytesIO(file.read()), encoding)
+        return io.TextIOWrapper(io.BytesIO(self._lookup(name).read()), encoding)
 
     def _get_cache_key(self, file: File[Self]) -> int:
         """Return the CRC of the VPK file."""
@@ -36,6 +36,8 @@ import srctools.logger
 
 LOGGER = srctools.logger.get_logger(__name__)
 SOUND_CACHE_VERSION = '2'  # Used to allow ignoring incompatible versions.
+# Entity Scripts are relative to this folder.
+_VSCRIPT_FOLDER = 'scripts/vscripts/'
 ParsedT = TypeVar('ParsedT')
 
 __all__ = [
@@ -583,11 +585,11 @@ class PackList:
 
         This returns the script name suitable for passing to Entity Scripts.
         """
+        # inject_file() keeps our prefix, strip it off since it's implied.
         return self.inject_file(
             code.encode('ascii'),
-            os.path.join('scripts/vscripts', folder), '.nut'
-            # Strip off the scripts/vscripts/ folder since it's implied.
-        )[17:]
+            _VSCRIPT_FOLDER + folder, '.nut',
+        )[len(_VSCRIPT_FOLDER):]
 
     def pack_soundscript(self, sound_name: str) -> None:
         """Pack a soundscript or raw sound file."""
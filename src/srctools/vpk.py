@@ -172,12 +172,20 @@ class FileInfo:
         """Return the contents for this file."""
         if self.arch_len:
             if self.arch_index is None:
-                return self.start_data + self.vpk.footer_data[self.offset: self.offset + self.arch_len]
+                end = self.offset + self.arch_len
+                if self.start_data:
+                    # Concatenate from a view, to avoid copying the slice first.
+                    return self.start_data + memoryview(self.vpk.footer_data)[self.offset:end]
+                return self.vpk.footer_data[self.offset:end]
             else:
                 arch_file = get_arch_filename(self.vpk.file_prefix, self.arch_index)
                 with open(os.path.join(self.vpk.folder, arch_file), 'rb') as data:
                     data.seek(self.offset)
-                    return self.start_data + data.read(self.arch_len)
+                    arch_data = data.read(self.arch_len)
+                # Usually there's no directory data, so we can skip copying.
+                if self.start_data:
+                    return self.start_data + arch_data
+                return arch_data
         else:
             return self.start_data
 
@@ -0,0 +1,475 @@
+"""Test the filesystem implementations."""
+from typing import Callable, Dict
+from pathlib import Path
+from zipfile import ZipFile
+import io
+import os
+import pickle
+import subprocess
+import sys
+import warnings
+
+import pytest
+
+from srctools.filesys import (
+    File, FileSystem, FileSystemChain, RawFileSystem, RootEscapeError, VirtualFileSystem,
+    VPKFileSystem, ZipFileSystem,
+)
+from srctools.vpk import VPK
+
+
+FILES: Dict[str, bytes] = {
+    'readme.txt': b'Read me!',
+    'materials/Tools/toolsnodraw.vmt': b'"LightmappedGeneric" {}',
+    'materials/tools/toolsskip.vmt': b'"LightmappedGeneric" { "$skip" 1 }',
+    'models/props/crate.mdl': b'IDST',
+    'models/props_extra/barrel.mdl': b'IDST2',
+}
+
+
+def make_raw(tmp_path: Path) -> FileSystem:
+    """Write the files to a folder."""
+    for filename, data in FILES.items():
+        path = tmp_path / 'raw' / filename
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+    return RawFileSystem(tmp_path / 'raw')
+
+
+def make_zip(tmp_path: Path) -> FileSystem:
+    """Write the files to a zip."""
+    path = tmp_path / 'files.zip'
+    with ZipFile(path, 'w') as zipfile:
+        zipfile.writestr('materials/', b'')  # Directory entries should be ignored.
+        for filename, data in FILES.items():
+            zipfile.writestr(filename, data)
+    return ZipFileSystem(path)
+
+
+def make_vpk(tmp_path: Path) -> FileSystem:
+    """Write the files to a VPK."""
+    path = tmp_path / 'pak01_dir.vpk'
+    with VPK(path, mode='w', dir_data_limit=4) as vpk:
+        for filename, data in FILES.items():
+            vpk.add_file(filename, data)
+    return VPKFileSystem(path)
+
+
+def make_virtual(tmp_path: Path) -> FileSystem:
+    """Produce a virtual filesystem."""
+    return VirtualFileSystem(FILES)
+
+
+def make_chain(tmp_path: Path) -> FileSystem:
+    """Produce a chain containing the files."""
+    return FileSystemChain(make_zip(tmp_path), VirtualFileSystem({'readme.txt': b'Overridden'}))
+
+
+# Raw filesystems are case-sensitive on Linux.
+CASE_INSENSITIVE = ['zip', 'vpk', 'virtual', 'chain']
+SYSTEMS: Dict[str, Callable[[Path], FileSystem]] = {
+    'raw': make_raw,
+    'zip': make_zip,
+    'vpk': make_vpk,
+    'virtual': make_virtual,
+    'chain': make_chain,
+}
+
+
+@pytest.fixture(params=list(SYSTEMS))
+def fsys(request: pytest.FixtureRequest, tmp_path: Path) -> FileSystem:
+    """Create each kind of filesystem."""
+    return SYSTEMS[request.param](tmp_path)
+
+
+@pytest.fixture(params=CASE_INSENSITIVE)
+def fsys_nocase(request: pytest.FixtureRequest, tmp_path: Path) -> FileSystem:
+    """Create each case-insensitive filesystem."""
+    return SYSTEMS[request.param](tmp_path)
+
+
+def test_lookup(fsys: FileSystem) -> None:
+    """Test looking up files by name."""
+    for filename, data in FILES.items():
+        assert filename in fsys
+        file = fsys[filename]
+        with file.open_bin() as f:
+            assert f.read() == data
+        with fsys.open_bin(filename) as f:
+            assert f.read() == data
+        with fsys.open_str(filename) as f:
+            assert f.read() == data.decode('utf8')
+
+    assert 'missing.txt' not in fsys
+    assert 'materials' not in fsys
+    with pytest.raises(FileNotFoundError):
+        fsys['missing.txt']
+    with pytest.raises(FileNotFoundError):
+        fsys.open_bin('models/props/missing.mdl')
+
+
+def test_lookup_normalise(fsys_nocase: FileSystem) -> None:
+    """Test case and slashes are ignored when looking up files."""
+    assert 'MATERIALS/tools/ToolsNodraw.vmt' in fsys_nocase
+    assert 'materials\\tools\\toolsskip.vmt' in fsys_nocase
+    file = fsys_nocase['Models\\Props\\CRATE.mdl']
+    with file.open_bin() as f:
+        assert f.read() == b'IDST'
+    with fsys_nocase.open_bin('materials\\TOOLS/toolsnodraw.VMT') as f:
+        assert f.read() == b'"LightmappedGeneric" {}'
+
+
+def test_walk_folder(fsys: FileSystem) -> None:
+    """Test walking through folders."""
+    assert sorted(file.path for file in fsys) == sorted(FILES)
+    assert sorted(file.path for file in fsys.walk_folder('')) == sorted(FILES)
+    assert sorted(file.path for file in fsys.walk_folder('models/props/')) == [
+        'models/props/crate.mdl',
+    ]
+    assert list(fsys.walk_folder('sound')) == []
+    for file in fsys.walk_folder('models'):
+        with file.open_bin() as f:
+            assert f.read() == FILES[file.path]
+
+
+def test_walk_folder_normalise(fsys_nocase: FileSystem) -> None:
+    """Test case and slashes are ignored when walking folders."""
+    assert sorted(file.path.casefold() for file in fsys_nocase.walk_folder('MATERIALS\\tools')) == [
+        'materials/tools/toolsnodraw.vmt',
+        'materials/tools/toolsskip.vmt',
+    ]
+
+
+def test_chain_prefix(tmp_path: Path) -> None:
+    """Test systems added with a prefix only expose that subfolder."""
+    chain = FileSystemChain((make_zip(tmp_path), 'materials'), VirtualFileSystem(FILES))
+    file = chain['tools/toolsskip.vmt']
+    assert FileSystemChain.get_system(file) is chain.systems[0][0]
+    assert FileSystemChain.get_system(chain['readme.txt']) is chain.systems[1][0]
+    assert sorted(file.path.casefold() for file in chain.walk_folder_repeat('tools')) == [
+        'tools/toolsnodraw.vmt',
+        'tools/toolsskip.vmt',
+    ]
+    assert sorted(file.path for file in chain.walk_folder('')) == sorted([
+        *FILES,
+        'Tools/toolsnodraw.vmt',
+        'tools/toolsskip.vmt',
+    ])
+
+
+def test_chain_cache(tmp_path: Path) -> None:
+    """Test the lookup cache is discarded when systems are changed."""
+    raw = make_raw(tmp_path)
+    chain = FileSystemChain(raw, cache_lookups=True)
+    assert chain.cache_lookups
+    assert 'new.txt' not in chain
+    assert FileSystemChain.get_system(chain['readme.txt']) is raw
+
+    # Modifying the list directly is done by the packlist.
+    virt = VirtualFileSystem({'new.txt': 'Virtual', 'readme.txt': 'Virtual'})
+    chain.systems.insert(0, (virt, ''))
+    assert 'new.txt' in chain
+    assert FileSystemChain.get_system(chain['readme.txt']) is virt
+    chain.systems.pop(0)
+    assert 'new.txt' not in chain
+    assert FileSystemChain.get_system(chain['readme.txt']) is raw
+
+    chain.add_sys(virt)
+    assert FileSystemChain.get_system(chain['new.txt']) is virt
+
+    # Changes to the underlying system need the cache to be cleared.
+    (tmp_path / 'raw' / 'new.txt').write_text('Raw')
+    assert FileSystemChain.get_system(chain['new.txt']) is virt
+    chain.clear_cache()
+    assert FileSystemChain.get_system(chain['new.txt']) is raw
+
+
+def test_chain_no_cache(tmp_path: Path) -> None:
+    """Test chains do not cache lookups by default, so new files are found."""
+    raw = make_raw(tmp_path)
+    chain = FileSystemChain(raw, VirtualFileSystem({'other.txt': 'Virtual'}))
+    assert not chain.cache_lookups
+    assert 'new.txt' not in chain
+    (tmp_path / 'raw' / 'new.txt').write_text('Raw')
+    assert 'new.txt' in chain
+    assert FileSystemChain.get_system(chain['new.txt']) is raw
+
+
+def test_raw_cache_key(tmp_path: Path) -> None:
+    """Test raw filesystems use the modification time as the cache key."""
+    fsys = make_raw(tmp_path)
+    mtime = (tmp_path / 'raw' / 'models/props/crate.mdl').stat().st_mtime_ns
+    assert fsys['models/props/crate.mdl'].cache_key() == mtime
+    [file] = fsys.walk_folder('models/props/')
+    assert file.cache_key() == mtime
+
+    # The walked file must notice later changes.
+    os.utime(tmp_path / 'raw' / 'models/props/crate.mdl', ns=(mtime, mtime + 10**9))
+    assert file.cache_key() == mtime + 10**9
+    (tmp_path / 'raw' / 'models/props/crate.mdl').unlink()
+    assert file.cache_key() == -1
+
+    file = fsys['readme.txt']
+    (tmp_path / 'raw' / 'readme.txt').unlink()
+    assert file.cache_key() == -1
+
+
+@pytest.mark.parametrize('cache_folders', [False, True])
+def test_raw_cache_folders(tmp_path: Path, cache_folders: bool) -> None:
+    """Test caching folder contents in raw filesystems."""
+    fsys = make_raw(tmp_path)
+    fsys = RawFileSystem(fsys.path, cache_folders=cache_folders)
+    assert fsys.cache_folders is cache_folders
+    assert 'readme.txt' in fsys
+    assert 'models/props/crate.mdl' in fsys
+    assert 'models/props/new.mdl' not in fsys
+    assert 'models/props' not in fsys  # Folders are not files.
+    assert 'sound/missing.wav' not in fsys
+    # The root itself is not a file, and the parent folder should not be cached.
+    assert '' not in fsys
+    assert '.' not in fsys
+    if cache_folders:
+        parent = os.path.normcase(str(tmp_path))
+        assert parent not in fsys._folder_cache  # type: ignore[operator]
+
+    (tmp_path / 'raw' / 'models/props/new.mdl').write_bytes(b'IDST')
+    assert ('models/props/new.mdl' in fsys) is not cache_folders
+    fsys.invalidate('models/')  # Different folder, no effect.
+    assert ('models/props/new.mdl' in fsys) is not cache_folders
+    fsys.invalidate('models/props')
+    assert 'models/props/new.mdl' in fsys
+    assert fsys['models/props/new.mdl'].path == 'models/props/new.mdl'
+
+    (tmp_path / 'raw' / 'readme.txt').unlink()
+    assert ('readme.txt' in fsys) is cache_folders
+    fsys.invalidate()
+    assert 'readme.txt' not in fsys
+
+
+def test_archive_lazy_index(tmp_path: Path) -> None:
+    """Test exact lookups in archives do not need to build the case-insensitive index."""
+    for fsys in [make_zip(tmp_path), make_vpk(tmp_path)]:
+        assert isinstance(fsys, (ZipFileSystem, VPKFileSystem))
+        assert fsys['models/props/crate.mdl'].path == 'models/props/crate.mdl'
+        assert 'materials/Tools/toolsnodraw.vmt' in fsys
+        assert not fsys._sorted_keys
+        # Needs the index, to find the other case.
+        assert 'materials/tools/toolsnodraw.vmt' in fsys
+        assert 'materials/Tools/toolsnodraw.vmt' in fsys
+        assert len(fsys._sorted_keys) == len(FILES)
+
+
+def test_archive_lazy_index_consistent(tmp_path: Path) -> None:
+    """Test lookups produce the same results before and after the index is built."""
+    path = tmp_path / 'case.zip'
+    with ZipFile(path, 'w') as zipfile:
+        zipfile.writestr('A.txt', b'upper')
+        zipfile.writestr('a.txt', b'lower')
+    zipfs = ZipFileSystem(path)
+    with VPK(tmp_path / 'case_dir.vpk', mode='w', dir_data_limit=4) as vpk:
+        vpk.add_file('A.txt', b'upper')
+        vpk.add_file('a.txt', b'lower')
+    vpk_casefs = VPKFileSystem(tmp_path / 'case_dir.vpk')
+    vpkfs = make_vpk(tmp_path)
+    for built in [False, True]:
+        if built:
+            list(zipfs.walk_folder())
+            list(vpk_casefs.walk_folder())
+            list(vpkfs.walk_folder())
+        for fsys in [zipfs, vpk_casefs]:
+            with fsys.open_bin('A.txt') as f:
+                assert f.read() == b'upper'
+            with fsys.open_bin('a.txt') as f:
+                assert f.read() == b'lower'
+        assert 'sound/../models/props/crate.mdl' not in vpkfs
+        assert 'models/./props/crate.mdl' not in vpkfs
+        assert 'models/props/crate.mdl' in vpkfs
+        assert 'models\\props\\crate.mdl' in vpkfs
+
+
+def test_zip_written_later() -> None:
+    """Test files added to the zip after the index was built are found."""
+    zipfile = ZipFile(io.BytesIO(), 'w')
+    zipfile.writestr('readme.txt', b'Read me!')
+    fsys = ZipFileSystem('<pakfile>', zipfile)
+    assert [file.path for file in fsys.walk_folder()] == ['readme.txt']
+    zipfile.writestr('New.txt', b'new')
+    assert 'New.txt' in fsys
+    assert 'new.txt' in fsys
+    assert sorted(file.path for file in fsys.walk_folder()) == ['New.txt', 'readme.txt']
+
+
+def test_equality(tmp_path: Path) -> None:
+    """Test comparing and hashing filesystems."""
+    raw_a = RawFileSystem(tmp_path / 'folder')
+    raw_b = RawFileSystem(str(tmp_path) + '/other/../folder/')
+    assert raw_a == raw_b
+    assert hash(raw_a) == hash(raw_b)
+    assert raw_a != RawFileSystem(tmp_path / 'other')
+    assert raw_a != make_zip(tmp_path)
+
+    chain_a = FileSystemChain(raw_a)
+    chain_b = FileSystemChain(raw_b)
+    assert chain_a == chain_b
+    assert hash(chain_a) == hash(chain_b)
+    chain_a.add_sys(raw_a, 'prefix')
+    assert chain_a != chain_b
+    assert hash(chain_a) == hash(FileSystemChain(raw_a, (raw_b, 'prefix')))
+    chain_a.systems.pop()
+    assert hash(chain_a) == hash(chain_b)
+
+
+def test_deprecated_refs() -> None:
+    """Test the reference methods warn, respecting the warning filters."""
+    fsys = VirtualFileSystem({})
+    with warnings.catch_warnings(record=True) as record:
+        warnings.simplefilter('always')
+        for _ in range(3):
+            fsys.open_ref()
+    assert len(record) == 3
+    assert all(warn.category is DeprecationWarning for warn in record)
+    assert all(warn.filename == __file__ for warn in record)
+
+    with pytest.warns(DeprecationWarning, match='filesystems are always open'):
+        fsys.close_ref()
+    with pytest.warns(DeprecationWarning, match='filesystems are always open'):
+        assert fsys.__enter__() is fsys
+    with pytest.warns(DeprecationWarning, match='filesystems are always open'):
+        fsys.__exit__(None, None, None)
+
+
+def test_raw_constrain_path(tmp_path: Path) -> None:
+    """Test raw filesystems prohibit accessing files outside the root."""
+    fsys = make_raw(tmp_path)
+    (tmp_path / 'outside.txt').write_bytes(b'Outside')
+    (tmp_path / 'raw_sibling').mkdir()
+    (tmp_path / 'raw_sibling' / 'file.txt').write_bytes(b'Sibling')
+
+    assert 'models/../readme.txt' in fsys
+    assert [file.path for file in fsys.walk_folder('models/..')] == [
+        file.path for file in fsys.walk_folder('')
+    ]
+    for name in ['../outside.txt', '../raw_sibling/file.txt', str(tmp_path / 'outside.txt')]:
+        with pytest.raises(RootEscapeError):
+            fsys.open_bin(name)
+
+    unconstrained = RawFileSystem(tmp_path / 'raw', constrain_path=False)
+    with unconstrained.open_bin('../raw_sibling/file.txt') as f:
+        assert f.read() == b'Sibling'
+
+
+def test_virtual_equality() -> None:
+    """Test comparing and hashing virtual filesystems."""
+    fsys = VirtualFileSystem({'a.txt': 'text', 'b.bin': b'binary'})
+    assert fsys == VirtualFileSystem({'a.txt': 'text', 'b.bin': b'binary'})
+    assert hash(fsys) == hash(VirtualFileSystem({'a.txt': 'text', 'b.bin': b'binary'}))
+    assert hash(fsys) == hash(fsys)
+    assert fsys != VirtualFileSystem({'a.txt': 'text', 'b.bin': b'binary'}, 'ascii')
+    assert fsys != VirtualFileSystem({'a.txt': 'text'})
+
+    # Mutable data can be used, but then can't be hashed.
+    mutable = VirtualFileSystem({'a.bin': bytearray(b'data')})
+    with pytest.raises(TypeError):
+        hash(mutable)
+
+
+def test_read_kv1(fsys: FileSystem) -> None:
+    """Test reading keyvalues files."""
+    kv = fsys.read_kv1('materials/tools/toolsskip.vmt')
+    assert kv.find_key('LightmappedGeneric')['$skip'] == '1'
+    kv = fsys.read_kv1(fsys['materials/tools/toolsskip.vmt'])
+    assert kv.find_key('LightmappedGeneric')['$skip'] == '1'
+
+
+def test_walk_folder_fast(fsys: FileSystem) -> None:
+    """Test walk_folder_fast() matches the files from walk_folder()."""
+    # Chains don't skip repeated files.
+    walk = fsys.walk_folder_repeat if isinstance(fsys, FileSystemChain) else fsys.walk_folder
+    for folder in ['', 'materials/', 'models/props/', 'sound/']:
+        assert sorted(path for path, data in fsys.walk_folder_fast(folder)) == sorted(
+            file.path for file in walk(folder)
+        )
+    done = set()
+    for path, data in fsys.walk_folder_fast(''):
+        if path not in done:  # Later repeats in chains are overridden.
+            done.add(path)
+            with fsys.open_bin(File(fsys, path, data)) as f:
+                assert f.read() == FILES[path]
+
+
+def test_chain_single(tmp_path: Path) -> None:
+    """Test chains containing a single system."""
+    zipfs = make_zip(tmp_path)
+    chain = FileSystemChain(zipfs)
+    assert 'Readme.txt' in chain
+    assert 'missing.txt' not in chain
+    file = chain['materials\\tools\\toolsskip.vmt']
+    assert file.path == 'materials/tools/toolsskip.vmt'
+    assert FileSystemChain.get_system(file) is zipfs
+    assert file.cache_key() == zipfs['materials/tools/toolsskip.vmt'].cache_key()
+    with chain.open_str('readme.txt') as f:
+        assert f.read() == 'Read me!'
+    with pytest.raises(FileNotFoundError):
+        chain.open_bin('missing.txt')
+    assert sorted(file.path for file in chain.walk_folder()) == sorted(FILES)
+    assert all(FileSystemChain.get_system(file) is zipfs for file in chain.walk_folder())
+
+    # Backslashes and folders must behave the same as in multi-system chains.
+    chain = FileSystemChain(make_raw(tmp_path))
+    assert 'materials\\tools\\toolsskip.vmt' in chain
+    with chain.open_bin('materials\\tools\\toolsskip.vmt') as f:
+        assert f.read() == b'"LightmappedGeneric" { "$skip" 1 }'
+    with chain.open_str('materials\\tools\\toolsskip.vmt') as f:
+        assert f.read() == '"LightmappedGeneric" { "$skip" 1 }'
+    assert 'materials' not in chain
+    with pytest.raises(FileNotFoundError):
+        chain.open_bin('materials')
+    with pytest.raises(FileNotFoundError):
+        chain.open_str('materials/tools')
+
+    # On case-sensitive disks, raw folders can contain files differing only in case.
+    (tmp_path / 'case').mkdir()
+    (tmp_path / 'case' / 'A.txt').write_bytes(b'upper')
+    (tmp_path / 'case' / 'a.txt').write_bytes(b'lower')
+    chain = FileSystemChain(RawFileSystem(tmp_path / 'case'))
+    assert len(list(chain.walk_folder())) == 1
+
+    # Prefixed systems still need to use the general path.
+    chain = FileSystemChain((zipfs, 'materials'))
+    assert 'tools/toolsskip.vmt' in chain
+    assert 'readme.txt' not in chain
+    with chain.open_str('tools/toolsnodraw.vmt') as f:
+        assert f.read() == '"LightmappedGeneric" {}'
+
+
+def test_pickle_hash(tmp_path: Path) -> None:
+    """Test hashes are not carried across processes when pickled."""
+    code = (
+        'import pickle, sys\n'
+        'from srctools.filesys import RawFileSystem, VirtualFileSystem\n'
+        'raw = RawFileSystem(sys.argv[1])\n'
+        'virt = VirtualFileSystem({"a.txt": "data"})\n'
+        'hash(raw), hash(virt)\n'
+        'sys.stdout.buffer.write(pickle.dumps((raw, virt)))\n'
+    )
+    env = {**os.environ, 'PYTHONHASHSEED': 'random'}
+    data = subprocess.run(
+        [sys.executable, '-c', code, str(tmp_path)],
+        check=True, capture_output=True, env=env,
+    ).stdout
+    raw, virt = pickle.loads(data)
+    assert raw in {RawFileSystem(tmp_path)}
+    assert virt in {VirtualFileSystem({'a.txt': 'data'})}
+
+
+def test_virtual_normpath() -> None:
+    """Test virtual filesystems still normalise unusual paths."""
+    fsys = VirtualFileSystem({'folder/x.txt': 'data'})
+    assert 'folder/x.txt' in fsys
+    assert 'Folder\\X.txt' in fsys
+    assert 'folder/./x.txt' in fsys
+    assert 'other/../folder/x.txt' in fsys
+    assert 'folder//x.txt' in fsys
+    assert './folder/x.txt' in fsys
+    with fsys.open_str('other/../folder/x.txt') as f:
+        assert f.read() == 'data'
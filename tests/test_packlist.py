@@ -1,5 +1,6 @@
 """Test packlist logic."""
-from srctools.packlist import strip_extension
+from srctools.filesys import VirtualFileSystem
+from srctools.packlist import PackList, strip_extension
 
 
 def test_strip_extensions() -> None:
@@ -8,3 +9,14 @@ def test_strip_extensions() -> None:
     assert strip_extension('directory/../file') == 'directory/../file'
     assert strip_extension('directory/../file.extension') == 'directory/../file'
     assert strip_extension('directory.dotted/filename') == 'directory.dotted/filename'
+
+
+def test_inject_vscript() -> None:
+    """Test injecting VScript code."""
+    packlist = PackList(VirtualFileSystem({}))
+    name = packlist.inject_vscript('printl("hello")')
+    assert name.startswith('inject/INJECT_')
+    assert name.endswith('.nut')
+    assert packlist.inject_vscript('printl("hello")') == name
+    assert packlist.inject_vscript('printl("hello")', 'sub\\folder/').startswith('sub/folder/INJECT_')
+    assert 'scripts/vscripts/' + name in packlist
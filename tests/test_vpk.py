@@ -1,4 +1,8 @@
 """Test the VPK parser."""
+from pathlib import Path
+
+import pytest
+
 from srctools import vpk
 
 
@@ -11,3 +15,37 @@ def test_ascii() -> None:
     # Special case, allow surrogate escape bytes too.
     for i in range(0xDC80, 0xDCFF + 1):
         assert vpk._check_is_ascii(chr(i) * 4)
+
+
+@pytest.mark.parametrize('dir_limit', [0, 4, 1024])
+def test_read(tmp_path: Path, dir_limit: int) -> None:
+    """Test reading files stored in the directory, archives or split between both."""
+    data = {
+        'empty.txt': b'',
+        'short.txt': b'abc',
+        'folder/long.txt': b'0123456789' * 10,
+    }
+    path = tmp_path / 'pak01_dir.vpk'
+    with vpk.VPK(path, mode='w', dir_data_limit=dir_limit) as pak:
+        for filename, contents in data.items():
+            pak.add_file(filename, contents)
+
+    pak = vpk.VPK(path)
+    for filename, contents in data.items():
+        file = pak[filename]
+        assert file.read() == contents
+        assert file.size == len(contents)
+        assert file.verify()
+
+
+def test_read_footer(tmp_path: Path) -> None:
+    """Test reading files stored after the directory in the _dir file."""
+    pak = vpk.VPK(tmp_path / 'pak01_dir.vpk', mode='w')
+    pak.footer_data = b'--footer--'
+    file = pak.new_file('footer.txt')
+    file.arch_index = None
+    file.offset = 2
+    file.arch_len = 6
+    assert file.read() == b'footer'
+    file.start_data = b'the '
+    assert file.read() == b'the footer'